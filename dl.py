@@ -17,20 +17,22 @@ dl.py  —  视频下载 Web 服务的 CLI 客户端
     python dl.py https://youtu.be/xxxx
     python dl.py https://youtu.be/xxxx -q 1080p -o ~/Downloads
     python dl.py https://youtu.be/xxxx -s https://my-app.onrender.com
+
+服务端按 vid_uid Cookie 区分用户：每个服务地址首次请求时分配的 ID 保存在
+~/.dl_uids.json（{服务地址: ID}），之后 history / dashboard 才能看到本机提交过的任务。
 """
 
 import sys
 import os
-import json
 import time
-import argparse
-import urllib.request
-import urllib.error
-import urllib.parse
 from pathlib import Path
 
+# json / http.client / argparse 等在用到的函数内按需导入：--help 或参数错误时无需加载，缩短冷启动
+
 DEFAULT_SERVER = os.environ.get("DL_SERVER", "http://localhost:5000")
 DEFAULT_OUTPUT = Path("downloads_cli")
+UID_COOKIE     = "vid_uid"
+UID_FILE       = Path.home() / ".dl_uids.json"
 
 STATUS_LABEL = {
     "pending":     "准备中...",
@@ -46,108 +48,328 @@ STATUS_LABEL = {
 
 # ── 轻量 HTTP 工具（无第三方依赖）──────────────────────────
 
-def _post(server: str, path: str, data: dict | None = None, files: dict | None = None) -> dict:
-    url = server.rstrip("/") + path
-    if files:
-        # multipart/form-data
-        boundary = "----Boundary" + str(int(time.time()))
-        body_parts = []
-        for name, (fname, fbytes) in files.items():
-            body_parts.append(
-                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
-                f'filename="{fname}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
-                + fbytes + b"\r\n"
-            )
-        body = b"".join(body_parts) + f"--{boundary}--\r\n".encode()
-        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
-    else:
-        body = json.dumps(data or {}).encode()
-        headers = {"Content-Type": "application/json"}
+# 热路径上复用的字面量，避免每次调用重新构造
+_SSE_PREFIX   = b"data:"
+_CRLF         = b"\r\n"
+_MULTIPART_CT = "multipart/form-data; boundary={}"
+_PART_HEAD    = (
+    'Content-Disposition: form-data; name="{}"; filename="{}"\r\n'
+    "Content-Type: application/octet-stream\r\n\r\n"
+)
+
+
+def _load_uids() -> dict:
+    import json
+
+    try:
+        uids = json.loads(UID_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    return uids if isinstance(uids, dict) else {}
+
+
+def _save_uid(server: str, uid: str) -> None:
+    """重新读取后只改 server 这一项，不覆盖其他服务地址（或其他进程写入）的 ID"""
+    import json
+
+    uids = _load_uids()
+    uids[server] = uid
+    try:
+        UID_FILE.write_text(json.dumps(uids, indent=1))
+    except OSError:
+        pass
+
+
+def _multipart_body(boundary: str, files: dict) -> tuple:
+    """构造流式 multipart 请求体，返回 (分块生成器, 总长度)；文件边读边发，不整体载入内存。"""
+    delim = b"--" + boundary.encode()
+    heads = [
+        (delim + _CRLF + _PART_HEAD.format(name, fname).encode(), Path(fpath))
+        for name, (fname, fpath) in files.items()
+    ]
+    tail = delim + b"--" + _CRLF
+    length = sum(len(head) + p.stat().st_size + len(_CRLF) for head, p in heads) + len(tail)
+
+    def chunks():
+        for head, p in heads:
+            yield head
+            with open(p, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    yield chunk
+            yield _CRLF
+        yield tail
+
+    return chunks(), length
+
+
+class Client:
+    """
+    Web 服务客户端：构造时解析一次服务地址，各请求只拼接路径。
+    JSON 请求和文件下载复用每个线程各自的 keep-alive 连接，省去每次请求的 TCP/TLS 握手。
+    """
+
+    def __init__(self, server: str) -> None:
+        import threading
+        from urllib.parse import urlsplit
+
+        self.base = server.rstrip("/")
+        u = urlsplit(self.base)
+        self._https  = u.scheme == "https"
+        self._netloc = u.netloc
+        self._prefix = u.path
+        self._local  = threading.local()    # 每个线程一条连接（dashboard 会并发请求）
+        self._uid_lock = threading.Lock()
+        self._uid = _load_uids().get(self.base, "")
+
+    def _headers(self, headers: dict | None) -> dict:
+        """附上用户 ID Cookie（/api/history、/api/jobs/active 按它过滤）"""
+        headers = dict(headers or {})
+        if self._uid:
+            headers["Cookie"] = f"{UID_COOKIE}={self._uid}"
+        return headers
+
+    def _remember_uid(self, r) -> None:
+        """保存服务端通过 Set-Cookie 分配的 ID（只更新本服务地址对应的条目），供之后的请求和下次运行使用"""
+        for cookie in r.headers.get_all("Set-Cookie") or ():
+            name, _, rest = cookie.partition("=")
+            if name.strip() != UID_COOKIE:
+                continue
+            uid = rest.split(";", 1)[0].strip()
+            with self._uid_lock:
+                if uid and uid != self._uid:
+                    self._uid = uid
+                    _save_uid(self.base, uid)
+            return
 
-    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    def _open(self, timeout: float):
+        import http.client
+
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return cls(self._netloc, timeout=timeout)
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _send(self, method: str, path: str, body=None, headers: dict | None = None, timeout: float = 30):
+        """在复用连接上发请求并返回未读取的响应；连接已被服务端关闭时重建并重试一次。"""
+        import http.client
+
+        for attempt in (0, 1):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._open(timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, self._prefix + path, body=body, headers=self._headers(headers))
+                r = conn.getresponse()
+                self._remember_uid(r)
+                return r
+            except (ConnectionError, http.client.HTTPException):
+                self._reset()
+                # 流式请求体已被消费，无法重发
+                if attempt or not isinstance(body, (bytes, type(None))):
+                    raise
+
+    def post(self, path: str, data: dict | bytes | None = None, files: dict | None = None) -> dict:
+        """data: dict 或已编码好的 JSON bytes；files: {字段名: (文件名, Path)}，文件以流式方式上传。"""
+        import json
+
+        if files:
+            # multipart/form-data
+            boundary = "----Boundary" + str(int(time.time()))
+            body, length = _multipart_body(boundary, files)
+            headers = {
+                "Content-Type": _MULTIPART_CT.format(boundary),
+                "Content-Length": str(length),
+            }
+        elif isinstance(data, bytes):
+            body = data
+            headers = {"Content-Type": "application/json"}
+        else:
+            body = json.dumps(data or {}, separators=(",", ":")).encode()
+            headers = {"Content-Type": "application/json"}
+
+        return json.loads(self._send("POST", path, body, headers).read())
+
+    def get(self, path: str) -> dict:
+        import json
+
+        return json.loads(self._send("GET", path).read())
+
+    def stream_sse(self, path: str):
+        """迭代 SSE 事件，每次 yield 一个解析后的 dict。长连接单独建立，结束即关闭。"""
+        import json
+
+        conn = self._open(120)
+        try:
+            conn.request("GET", self._prefix + path, headers=self._headers({"Accept": "text/event-stream"}))
+            r = conn.getresponse()
+            if r.status != 200:         # 代理 / 服务端的错误页不能当作空的事件流
+                raise RuntimeError(f"HTTP {r.status} {r.reason}")
+            for raw in r:
+                if raw.startswith(_SSE_PREFIX):
+                    try:
+                        yield json.loads(raw[len(_SSE_PREFIX):])
+                    except ValueError:      # JSON 格式错误或非法 UTF-8
+                        pass
+        finally:
+            conn.close()
+
+    def download_file(self, path: str, dest: Path, retries: int = 3) -> None:
+        """
+        下载到 dest.part，断线后按已写入大小发 Range 请求续传，完成后改名为 dest。
+        首个响应的 ETag / Last-Modified 记在 dest.part.tag 中，续传时作为 If-Range 发送：
+        服务器上的文件已变（或 .part 属于别的任务）时服务器会返回完整文件，从头重下。
+        """
+        import http.client
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        tag  = dest.with_name(dest.name + ".part.tag")
+        # 复用同一块缓冲区：readinto 直接写入，避免每个分块都分配新的 bytes 对象
+        buf = bytearray(1 << 20)
+        view = memoryview(buf)
+        attempt = 0
+        while True:
+            start = part.stat().st_size if part.exists() else 0
+            validator = tag.read_text().strip() if start and tag.exists() else ""
+            if start and not validator:
+                start = 0                       # 无法确认 .part 的来源，不续传
+            headers = {"Range": f"bytes={start}-", "If-Range": validator} if start else {}
+            try:
+                r = self._send("GET", path, headers=headers, timeout=300)
+                if r.status == 416 and start:
+                    r.read()
+                    # 只有 .part 恰好等于服务器文件大小时才算已下完，否则丢弃重下
+                    if _range_total(r.headers.get("Content-Range", "")) == start:
+                        break
+                    part.unlink(missing_ok=True)
+                    tag.unlink(missing_ok=True)
+                    continue
+                if r.status >= 400:
+                    r.read()
+                    raise RuntimeError(f"HTTP {r.status} {r.reason}")
+                if r.status != 206:
+                    start = 0                   # 服务器忽略了 Range 或文件已变，从头下载
+                    validator = r.headers.get("ETag") or r.headers.get("Last-Modified") or ""
+                    if validator:
+                        tag.write_text(validator)
+                    else:
+                        tag.unlink(missing_ok=True)
+                length = int(r.headers.get("Content-Length", 0))
+                total = start + length if length else 0
+                done = start
+                with open(part, "ab" if start else "wb") as f:
+                    while True:
+                        n = r.readinto(buf)
+                        if not n:
+                            break
+                        f.write(view[:n])
+                        done += n
+                        if total:
+                            pct = done * 100 // total
+                            bar = "█" * (pct // 5) + "░" * (20 - pct // 5)
+                            mb = f"{done/1024/1024:.1f}/{total/1024/1024:.1f} MB"
+                            print(f"\r  [{bar}] {pct:3d}%  {mb}  ", end="", flush=True)
+                # readinto 遇到连接提前关闭只会返回 0，需自行比对长度
+                if total and done < total:
+                    raise http.client.IncompleteRead(b"", total - done)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self._reset()
+                if attempt == retries:
+                    raise
+                wait = 2 ** attempt
+                attempt += 1
+                print(f"\n  ⚠️  连接中断（{e}），{wait} 秒后续传...")
+                time.sleep(wait)
+        part.replace(dest)
+        tag.unlink(missing_ok=True)
+        print()
+
+
+def _range_total(content_range: str) -> int:
+    """从 "bytes */N" 或 "bytes a-b/N" 中取出文件总大小，无法解析时返回 -1"""
     try:
-        with urllib.request.urlopen(req, timeout=30) as r:
-            return json.loads(r.read())
-    except urllib.error.HTTPError as e:
-        return json.loads(e.read())
-
-
-def _get(server: str, path: str) -> dict:
-    url = server.rstrip("/") + path
-    req = urllib.request.Request(url)
-    with urllib.request.urlopen(req, timeout=30) as r:
-        return json.loads(r.read())
-
-
-def _stream_sse(server: str, path: str):
-    """迭代 SSE 事件，每次 yield 一个解析后的 dict。"""
-    url = server.rstrip("/") + path
-    req = urllib.request.Request(url, headers={"Accept": "text/event-stream"})
-    with urllib.request.urlopen(req, timeout=120) as r:
-        for raw in r:
-            line = raw.decode(errors="replace").rstrip("\n")
-            if line.startswith("data:"):
-                try:
-                    yield json.loads(line[5:].strip())
-                except json.JSONDecodeError:
-                    pass
-
-
-def _download_file(server: str, path: str, dest: Path) -> None:
-    url = server.rstrip("/") + path
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    with urllib.request.urlopen(url, timeout=300) as r:
-        total = int(r.headers.get("Content-Length", 0))
-        done = 0
-        with open(dest, "wb") as f:
-            while True:
-                chunk = r.read(65536)
-                if not chunk:
-                    break
-                f.write(chunk)
-                done += len(chunk)
-                if total:
-                    pct = done * 100 // total
-                    bar = "█" * (pct // 5) + "░" * (20 - pct // 5)
-                    print(f"\r  [{bar}] {pct:3d}%  {done/1024/1024:.1f}/{total/1024/1024:.1f} MB  ", end="", flush=True)
-    print()
+        return int(content_range.rpartition("/")[2])
+    except ValueError:
+        return -1
 
 
 # ── 进度条渲染 ─────────────────────────────────────────────
 
-def _bar(pct: float, width: int = 25) -> str:
-    filled = int(pct / 100 * width)
-    return "█" * filled + "░" * (width - filled)
+BAR_WIDTH = 25
+# 预先生成所有可能的进度条字符串（filled = 0..BAR_WIDTH），渲染时只需查表
+_BARS = ["█" * f + "░" * (BAR_WIDTH - f) for f in range(BAR_WIDTH + 1)]
+
+
+def _bar(pct: float) -> str:
+    return _BARS[min(BAR_WIDTH, max(0, int(pct * (BAR_WIDTH / 100))))]
 
 
-def _print_progress(job: dict) -> None:
-    status = job.get("status", "")
-    label  = STATUS_LABEL.get(status, status)
-    pct    = job.get("progress", 0)
-    speed  = job.get("speed", "")
-    eta    = job.get("eta", "")
-    qpos   = job.get("queue_pos", 0)
+class _ProgressPrinter:
+    """
+    SSE 进度输出到终端。两层过滤：
+      - 下载中且（整数百分比, 速度, 剩余时间）与上次绘制相同 → 跳过
+      - 同一状态下按固定间隔节流（TTY 10 Hz，非 TTY 1 Hz）；状态变化时立即刷新
+    """
 
-    if status in ("queued", "pending"):
-        q = f"  前方 {qpos} 个任务" if qpos > 0 else ""
-        print(f"\r  ⏳ {label}{q}                          ", end="", flush=True)
-    elif status in ("downloading",):
-        extra = f"  {speed}" if speed else ""
-        extra += f"  剩余 {eta}" if eta else ""
-        print(f"\r  [{_bar(pct)}] {pct:5.1f}%{extra}  ", end="", flush=True)
-    elif status in ("merging", "translating", "burning"):
-        extra = f" {pct}%" if pct else ""
-        print(f"\r  ⏳ {label}{extra}...                   ", end="", flush=True)
+    def __init__(self) -> None:
+        self._interval = 0.1 if sys.stdout.isatty() else 1.0
+        self._last = 0.0
+        self._status = None
+        self._key = None
+
+    def __call__(self, job: dict) -> None:
+        status = job.get("status", "")
+        pct    = job.get("progress", 0)
+        if status == "downloading":
+            speed = job.get("speed", "")
+            eta   = job.get("eta", "")
+            key = (int(pct), speed, eta)
+            if key == self._key and status == self._status:
+                return
+
+        now = time.monotonic()
+        if status == self._status and now - self._last < self._interval:
+            return
+        self._last = now
+        self._status = status
+
+        if status == "downloading":
+            self._key = key
+            extra = f"  {speed}" if speed else ""
+            extra += f"  剩余 {eta}" if eta else ""
+            print(f"\r  [{_bar(pct)}] {pct:5.1f}%{extra}  ", end="", flush=True)
+            return
+
+        label = STATUS_LABEL.get(status, status)
+        if status in ("queued", "pending"):
+            qpos = job.get("queue_pos", 0)
+            q = f"  前方 {qpos} 个任务" if qpos > 0 else ""
+            print(f"\r  ⏳ {label}{q}                          ", end="", flush=True)
+        elif status in ("merging", "translating", "burning"):
+            extra = f" {pct}%" if pct else ""
+            print(f"\r  ⏳ {label}{extra}...                   ", end="", flush=True)
 
 
 # ── 主流程 ────────────────────────────────────────────────
 
-def cmd_download(server: str, url: str, quality: str, output_dir: Path) -> None:
+def cmd_download(client: Client, url: str, quality: str, output_dir: Path) -> None:
+    import json
+
     print(f"\n🔗 {url}")
-    print(f"📶 画质: {quality}  |  服务: {server}\n")
+    print(f"📶 画质: {quality}  |  服务: {client.base}\n")
 
     # 1. 提交下载任务
-    resp = _post(server, "/api/download", {"url": url, "quality": quality})
+    # 请求体只有两个字段，直接拼出紧凑 JSON，省去 dict 构造和 json.dumps 整体序列化
+    body = b'{"url":%s,"quality":%s}' % (json.dumps(url).encode(), json.dumps(quality).encode())
+    resp = client.post("/api/download", body)
     if "error" in resp:
         print(f"❌ 提交失败: {resp['error']}")
         sys.exit(1)
@@ -156,9 +378,11 @@ def cmd_download(server: str, url: str, quality: str, output_dir: Path) -> None:
     print(f"  任务 ID: {job_id}")
 
     # 2. 订阅 SSE 进度
+    print_progress = _ProgressPrinter()
+    job = {}
     try:
-        for job in _stream_sse(server, f"/api/progress/{job_id}"):
-            _print_progress(job)
+        for job in client.stream_sse(f"/api/progress/{job_id}"):
+            print_progress(job)
             if job.get("status") == "done":
                 print(f"\n\n✅ 《{job.get('title', '')}》下载完成")
                 break
@@ -168,30 +392,32 @@ def cmd_download(server: str, url: str, quality: str, output_dir: Path) -> None:
     except KeyboardInterrupt:
         print("\n\n⚠️  已中断（任务仍在服务器后台运行）")
         print(f"  稍后可用以下命令检查状态：")
-        print(f"  python dl.py status {job_id} -s {server}")
+        print(f"  python dl.py status {job_id} -s {client.base}")
         sys.exit(0)
     except Exception as e:
         print(f"\n\n❌ SSE 断开: {e}")
         sys.exit(1)
 
-    # 3. 取回文件信息并保存到本地
-    job_info = _get(server, f"/api/job/{job_id}")
+    # 3. 保存到本地：done 事件已携带完整任务信息；流提前结束或缺字段时再查一次 /api/job
+    job_info = job
+    if job_info.get("status") != "done" or not (job_info.get("original_filename") or job_info.get("filename")):
+        job_info = client.get(f"/api/job/{job_id}")
     filename = job_info.get("original_filename") or job_info.get("filename") or "video.mp4"
     dest = output_dir / filename
     output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"\n⬇️  正在保存到: {dest}")
     try:
-        _download_file(server, f"/api/file/{job_id}/original", dest)
+        client.download_file(f"/api/file/{job_id}/original", dest)
         print(f"✅ 已保存: {dest.resolve()}")
     except Exception as e:
         print(f"❌ 保存失败: {e}")
-        print(f"   也可以在浏览器打开: {server}/api/file/{job_id}/original")
+        print(f"   也可以在浏览器打开: {client.base}/api/file/{job_id}/original")
 
 
-def cmd_status(server: str, job_id: str) -> None:
+def cmd_status(client: Client, job_id: str) -> None:
     try:
-        job = _get(server, f"/api/job/{job_id}")
+        job = client.get(f"/api/job/{job_id}")
         if "error" in job:
             print(f"❌ {job['error']}")
             return
@@ -209,43 +435,79 @@ def cmd_status(server: str, job_id: str) -> None:
         print(f"❌ 无法连接服务: {e}")
 
 
-def cmd_history(server: str) -> None:
+def _print_history(items: list) -> None:
+    if not items:
+        print("  暂无下载历史")
+        return
+    for item in items:
+        status = item.get("status", "")
+        icon = "✅" if status == "done" else "❌"
+        burned = " [有烧录版]" if item.get("burned_filename") else ""
+        print(f"  {icon} {item.get('title') or item.get('filename', '未知')}{burned}")
+        print(f"      job_id: {item['job_id']}  |  {item.get('completed_at', '')}")
+
+
+def _print_cookies(pool: list) -> None:
+    if not pool:
+        print("  暂无 Cookie")
+        return
+    for i, c in enumerate(pool, 1):
+        v = c.get("valid")
+        badge = "✅ 正常" if v is True else ("❌ 已失效" if v is False else "⚪ 未验证")
+        if c.get("checking"):
+            badge = "⏳ 检测中"
+        cnt = c.get("use_count", 0)
+        lu  = c.get("last_used_ago") or "从未"
+        print(f"  Cookie {i}  {c['size_kb']} KB  {badge}  {cnt}次 · {lu}")
+
+
+def _print_active(jobs: list) -> None:
+    if not jobs:
+        print("  暂无进行中的任务")
+        return
+    for job in jobs:
+        status = job.get("status", "")
+        label  = STATUS_LABEL.get(status, status)
+        print(f"  ⏳ {job.get('title') or job.get('url', '未知')}  {label} {job.get('progress', 0):.1f}%")
+        print(f"      job_id: {job['job_id']}")
+
+
+def cmd_history(client: Client) -> None:
     try:
-        items = _get(server, "/api/history")
-        if not items:
-            print("  暂无下载历史")
-            return
-        for item in items:
-            status = item.get("status", "")
-            icon = "✅" if status == "done" else "❌"
-            burned = " [有烧录版]" if item.get("burned_filename") else ""
-            print(f"  {icon} {item.get('title') or item.get('filename', '未知')}{burned}")
-            print(f"      job_id: {item['job_id']}  |  {item.get('completed_at', '')}")
+        _print_history(client.get("/api/history"))
     except Exception as e:
         print(f"❌ 无法获取历史: {e}")
 
 
-def cmd_cookies(server: str) -> None:
+def cmd_cookies(client: Client) -> None:
     try:
-        pool = _get(server, "/api/cookies/pool")
-        if not pool:
-            print("  暂无 Cookie")
-            return
-        for i, c in enumerate(pool, 1):
-            v = c.get("valid")
-            badge = "✅ 正常" if v is True else ("❌ 已失效" if v is False else "⚪ 未验证")
-            if c.get("checking"):
-                badge = "⏳ 检测中"
-            cnt = c.get("use_count", 0)
-            lu  = c.get("last_used_ago") or "从未"
-            print(f"  Cookie {i}  {c['size_kb']} KB  {badge}  {cnt}次 · {lu}")
+        _print_cookies(client.get("/api/cookies/pool"))
     except Exception as e:
         print(f"❌ 无法获取 Cookie 池: {e}")
 
 
-def cmd_check_cookies(server: str) -> None:
+def cmd_dashboard(client: Client) -> None:
+    """并发拉取历史、进行中任务和 Cookie 池，一次请求耗时约等于最慢的一个。"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    sections = [
+        ("📜 下载历史",   "/api/history",      _print_history),
+        ("⏳ 进行中任务", "/api/jobs/active",  _print_active),
+        ("🍪 Cookie 池",  "/api/cookies/pool", _print_cookies),
+    ]
+    with ThreadPoolExecutor(len(sections)) as pool:
+        futures = [pool.submit(client.get, path) for _, path, _ in sections]
+    for (title, _, render), fut in zip(sections, futures):
+        print(f"\n{title}")
+        try:
+            render(fut.result())
+        except Exception as e:
+            print(f"❌ 获取失败: {e}")
+
+
+def cmd_check_cookies(client: Client) -> None:
     try:
-        resp = _post(server, "/api/cookies/check_all")
+        resp = client.post("/api/cookies/check_all")
         n = resp.get("checking", 0)
         if n == 0:
             print("  暂无 Cookie 可检测")
@@ -255,12 +517,12 @@ def cmd_check_cookies(server: str) -> None:
         print(f"❌ 失败: {e}")
 
 
-def cmd_upload_cookie(server: str, filepath: str) -> None:
+def cmd_upload_cookie(client: Client, filepath: str) -> None:
     p = Path(filepath)
     if not p.exists():
         print(f"❌ 文件不存在: {p}")
         sys.exit(1)
-    resp = _post(server, "/api/cookies/upload", files={"file": (p.name, p.read_bytes())})
+    resp = client.post("/api/cookies/upload", files={"file": (p.name, p)})
     if resp.get("ok"):
         print(f"✅ Cookie 已上传，池中共 {resp['count']} 个")
     else:
@@ -270,6 +532,13 @@ def cmd_upload_cookie(server: str, filepath: str) -> None:
 # ── CLI 解析 ─────────────────────────────────────────────
 
 def main() -> None:
+    # 最常见的 `dl.py <URL>` 用法直接走快速路径，跳过 argparse 的导入和解析
+    if len(sys.argv) == 2 and sys.argv[1].startswith("http"):
+        cmd_download(Client(DEFAULT_SERVER), sys.argv[1], "best", DEFAULT_OUTPUT)
+        return
+
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="视频下载 Web 服务 CLI 客户端",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -278,6 +547,7 @@ def main() -> None:
   <URL>              提交下载任务并保存到本地
   status <job_id>    查询任务状态
   history            显示最近下载历史
+  dashboard          同时显示历史、进行中任务和 Cookie 池
   cookies            查看 Cookie 池状态
   check-cookies      触发后台检测所有 Cookie
   upload-cookie <文件> 上传 Cookie 文件
@@ -305,7 +575,7 @@ def main() -> None:
                         help=f"Web 服务地址 (默认: {DEFAULT_SERVER})")
 
     args = parser.parse_args()
-    server = args.server.rstrip("/")
+    client = Client(args.server)
 
     if not args.command:
         parser.print_help()
@@ -314,23 +584,25 @@ def main() -> None:
     cmd = args.command
 
     if cmd in ("history",):
-        cmd_history(server)
+        cmd_history(client)
+    elif cmd in ("dashboard",):
+        cmd_dashboard(client)
     elif cmd in ("cookies",):
-        cmd_cookies(server)
+        cmd_cookies(client)
     elif cmd in ("check-cookies",):
-        cmd_check_cookies(server)
+        cmd_check_cookies(client)
     elif cmd in ("status",):
         if not args.extra:
             print("用法: python dl.py status <job_id>")
             sys.exit(1)
-        cmd_status(server, args.extra[0])
+        cmd_status(client, args.extra[0])
     elif cmd in ("upload-cookie",):
         if not args.extra:
             print("用法: python dl.py upload-cookie <cookies.txt 路径>")
             sys.exit(1)
-        cmd_upload_cookie(server, args.extra[0])
+        cmd_upload_cookie(client, args.extra[0])
     elif cmd.startswith("http"):
-        cmd_download(server, cmd, args.quality, Path(args.output))
+        cmd_download(client, cmd, args.quality, Path(args.output))
     else:
         print(f"未知命令或无效链接: {cmd}")
         parser.print_help()
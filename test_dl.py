@@ -0,0 +1,86 @@
+"""Resume tests for dl.Client.download_file against a local send_file server."""
+import threading
+import urllib.request
+
+import pytest
+from flask import Flask, request, send_file
+from werkzeug.serving import make_server
+
+from dl import Client
+
+PAYLOAD = bytes(range(256)) * 4     # 1 KiB; a stale prefix differs from the real bytes
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    """Serve PAYLOAD via send_file and record the request headers of each hit."""
+    src = tmp_path_factory.mktemp("srv") / "video.mp4"
+    src.write_bytes(PAYLOAD)
+    seen = []
+    app = Flask(__name__)
+
+    @app.route("/file")
+    def file():
+        seen.append(dict(request.headers))
+        return send_file(src, as_attachment=True, download_name="video.mp4")
+
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_port}"
+    with urllib.request.urlopen(base + "/file") as r:
+        etag = r.headers["ETag"]
+    yield base, etag, seen
+    httpd.shutdown()
+
+
+def download(base, dest):
+    Client(base).download_file("/file", dest, retries=0)
+    assert dest.read_bytes() == PAYLOAD
+    assert not dest.with_name(dest.name + ".part").exists()
+    assert not dest.with_name(dest.name + ".part.tag").exists()
+
+
+def test_fresh_download(server, tmp_path):
+    base, _, _ = server
+    download(base, tmp_path / "x.mp4")
+
+
+def test_resume_with_matching_validator(server, tmp_path):
+    base, etag, seen = server
+    dest = tmp_path / "x.mp4"
+    (tmp_path / "x.mp4.part").write_bytes(PAYLOAD[:300])
+    (tmp_path / "x.mp4.part.tag").write_text(etag)
+    download(base, dest)
+    assert seen[-1]["Range"] == "bytes=300-"
+    assert seen[-1]["If-Range"] == etag
+
+
+def test_stale_part_from_other_file_is_discarded(server, tmp_path):
+    base, _, _ = server
+    (tmp_path / "x.mp4.part").write_bytes(b"\0" * 300)
+    (tmp_path / "x.mp4.part.tag").write_text('"some-other-file"')
+    download(base, tmp_path / "x.mp4")
+
+
+def test_part_without_validator_restarts(server, tmp_path):
+    base, _, seen = server
+    (tmp_path / "x.mp4.part").write_bytes(b"\0" * 300)
+    download(base, tmp_path / "x.mp4")
+    assert "Range" not in seen[-1]
+
+
+def test_416_with_oversized_part_restarts(server, tmp_path):
+    base, etag, seen = server
+    (tmp_path / "x.mp4.part").write_bytes(b"\0" * 5000)
+    (tmp_path / "x.mp4.part.tag").write_text(etag)
+    download(base, tmp_path / "x.mp4")
+    assert seen[-2]["Range"] == "bytes=5000-"
+    assert "Range" not in seen[-1]
+
+
+def test_416_with_complete_part_is_accepted(server, tmp_path):
+    base, etag, seen = server
+    (tmp_path / "x.mp4.part").write_bytes(PAYLOAD)
+    (tmp_path / "x.mp4.part.tag").write_text(etag)
+    download(base, tmp_path / "x.mp4")
+    assert seen[-1]["Range"] == f"bytes={len(PAYLOAD)}-"
@@ -6,60 +6,292 @@ YouTube 视频下载 Web 服务
     python web_downloader.py
 
 然后在手机浏览器输入屏幕显示的地址即可访问（手机与电脑需在同一 Wi-Fi）
+
+部署在 nginx 后面时，可设置 USE_XACCEL=1 让 nginx 直接发送视频文件
+（sendfile 零拷贝，Python 进程不再搬运数据）。此时需固定下载目录，例如
+YTDL_DOWNLOAD_DIR=/srv/yt_web，并在 nginx 中加入:
+
+    location /_downloads/ {
+        internal;
+        alias /srv/yt_web/;
+        sendfile on;
+        tcp_nopush on;
+    }
 """
 
 import os
+import re
 import sys
+import gzip
 import json
 import time
 import uuid
+import queue
+import shutil
 import socket
 import tempfile
 import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from importlib import invalidate_caches
+from importlib.util import find_spec
 from pathlib import Path
+from urllib.parse import parse_qs, quote, urlsplit
 
 
 def ensure_deps() -> None:
-    """自动安装所需依赖"""
-    missing = []
-    for package, import_name in [("flask", "flask"), ("yt-dlp", "yt_dlp")]:
-        try:
-            __import__(import_name)
-        except ImportError:
-            missing.append(package)
+    """自动安装所需依赖（find_spec 只查找不导入，依赖齐全时几乎零开销）"""
+    missing = [
+        package
+        for package, import_name in [("flask", "flask"), ("yt-dlp", "yt_dlp")]
+        if find_spec(import_name) is None
+    ]
     if missing:
         print(f"正在安装依赖: {', '.join(missing)} ...")
         subprocess.check_call(
             [sys.executable, "-m", "pip", "install"] + missing,
             stdout=subprocess.DEVNULL,
         )
+        invalidate_caches()     # 让刚安装的包能被后续 import 找到
         print("依赖安装完成\n")
 
 
 ensure_deps()
 
-from flask import Flask, request, jsonify, send_file, Response  # noqa: E402
+from flask import Flask, request, jsonify, Response  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from werkzeug.wsgi import wrap_file  # noqa: E402
 import yt_dlp  # noqa: E402
 
 app = Flask(__name__)
 app.config["JSON_AS_ASCII"] = False
 
-# 下载任务存储（内存中）
-tasks: dict[str, dict] = {}
+# 可选：安装了 orjson 时用它序列化 SSE 消息和 API 响应（C 实现，直接输出 UTF-8 bytes）
+try:
+    import orjson
+
+    def json_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    class OrjsonProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(obj, default=self.default).decode()
 
-DOWNLOAD_DIR = Path(tempfile.mkdtemp(prefix="yt_web_"))
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+except ImportError:
+    def json_bytes(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
+
+
+def sse_frame(obj) -> bytes:
+    return b"data: " + json_bytes(obj) + b"\n\n"
+
+
+# 下载任务存储（内存中）
+tasks: dict[str, "Task"] = {}
+
+# 进行中的下载：(规范化链接, 画质) → task_id。相同请求直接复用同一任务和文件
+inflight: dict[tuple[str, str], str] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+SSE_HEARTBEAT = 15      # 秒：无进度变化时发送注释行，防止代理断开空闲连接
+
+# 设置后文件下载只返回 X-Accel-Redirect 头，由 nginx 的 internal location 发送文件
+USE_XACCEL    = bool(os.environ.get("USE_XACCEL"))
+XACCEL_PREFIX = "/_downloads/"
+if USE_XACCEL and not os.environ.get("YTDL_DOWNLOAD_DIR"):
+    # 随机临时目录无法写进 nginx 的 alias，所有下载都会 404
+    sys.exit("USE_XACCEL 需要同时设置 YTDL_DOWNLOAD_DIR（与 nginx 中 alias 指向的目录一致）")
+
+DOWNLOAD_DIR = Path(
+    os.environ.get("YTDL_DOWNLOAD_DIR") or tempfile.mkdtemp(prefix="yt_web_")
+)
+
+TASK_TTL      = 3600          # 秒：任务结束后保留状态和文件的时长，之后一并清理
+STALE_DIR_AGE = 24 * 3600     # 秒：启动时删除早于此时间的遗留任务目录
+
+# HLS/DASH 分片并发下载数（1080p 以上基本都是分片流）
+FRAG_WORKERS = int(os.environ.get("YTDL_FRAG_WORKERS", "8"))
+
+# 网络卡住时 15 秒内失败并进入重试，而不是无限期挂起
+SOCKET_TIMEOUT = 15
+
+# 下载阶段（占网络）和 ffmpeg 合并/转码阶段（占 CPU）分开限流：
+# 任务进入后处理时立即让出下载名额，下一个任务的下载与本任务的合并并行进行
+MAX_CONCURRENT = int(os.environ.get("YTDL_MAX_CONCURRENT", "2"))
+MUX_WORKERS    = os.cpu_count() or 2
+DL_SLOTS  = threading.BoundedSemaphore(MAX_CONCURRENT)
+MUX_SLOTS = threading.BoundedSemaphore(MUX_WORKERS)
+# 超出名额的任务在线程池或 DL_SLOTS 上排队（状态 queued）
+DL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT + MUX_WORKERS,
+    thread_name_prefix="yt_dl",
+)
 
 FORMAT_MAP = {
     "best":  "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best",
     "1080p": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080]",
     "720p":  "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720]",
     "480p":  "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480]",
-    "audio": "bestaudio/best",
+    # 单个渐进式 mp4（音视频已在同一文件）：无需 ffmpeg 合并，下载完即可保存。
+    # 最高 720p（YouTube 上通常只有 360p 的 18 号格式）；站点没有单文件 mp4 时退回 best
+    "fast":  "best[height<=720][ext=mp4][protocol^=http]/best[height<=720][ext=mp4]/best[height<=720]/best",
+    # 优先 m4a：后处理只需 -c copy 封装，不必重新编码
+    "audio": "bestaudio[ext=m4a]/bestaudio/best",
 }
 
+MIME_TYPES = {".m4a": "audio/mp4", ".mp3": "audio/mpeg"}
 
+
+class Task:
+    """
+    单个下载任务的状态。下载线程写、SSE / 请求线程读，字段读写都在锁内进行，
+    snapshot() 返回一致的副本，避免推送出“进度已更新但速度还是旧值”的半更新帧。
+
+    同一任务可能有多个 SSE 连接（如下载中刷新页面）：每个连接订阅一个队列，
+    状态变化时只序列化一次，把同一份 SSE 帧字节分发给所有订阅者。
+    """
+
+    __slots__ = (
+        "status", "progress", "speed", "eta", "error", "filename", "filepath", "title",
+        "_lock", "_subs", "_last_push", "_last_pct",
+    )
+    PUBLIC = ("status", "progress", "speed", "eta", "error", "filename", "filepath", "title")
+    TERMINAL = ("done", "error")
+
+    def __init__(self) -> None:
+        self.status   = "queued"
+        self.progress = 0
+        self.speed    = ""
+        self.eta      = ""
+        self.error    = ""
+        self.filename = ""
+        self.filepath = ""
+        self.title    = ""
+        self._lock    = threading.Lock()
+        self._subs: list[queue.Queue] = []          # SSE 订阅者的事件队列
+        self._last_push = 0.0                       # 上次推送的时间 / 进度（节流用）
+        self._last_pct  = -1.0
+
+    def _snapshot(self) -> dict:
+        return {k: getattr(self, k) for k in self.PUBLIC}
+
+    def _event(self) -> tuple[bytes, bool]:
+        """当前状态的 SSE 帧，以及是否已是终态"""
+        return sse_frame(self._snapshot()), self.status in self.TERMINAL
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return self._snapshot()
+
+    def subscribe(self) -> tuple[queue.Queue, tuple[bytes, bool]]:
+        """注册一个订阅队列，同时返回当前状态（同一把锁内，不会漏掉中间的更新）"""
+        q = queue.Queue(maxsize=4)
+        with self._lock:
+            self._subs.append(q)
+            return q, self._event()
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            try:
+                self._subs.remove(q)
+            except ValueError:
+                pass
+
+    def update(self, push: bool = True, **fields) -> None:
+        """更新字段；push=True 时把最新状态推给每个订阅者"""
+        with self._lock:
+            for k, v in fields.items():
+                setattr(self, k, v)
+        if push:
+            self.publish()
+
+    def publish(self) -> None:
+        """把当前状态推给每个订阅者；没有订阅者时不做序列化"""
+        with self._lock:
+            if not self._subs:
+                return
+            event = self._event()
+            subs  = list(self._subs)
+        for q in subs:
+            self._push(q, event)
+
+    @staticmethod
+    def _push(q: queue.Queue, event: tuple[bytes, bool]) -> None:
+        while True:
+            try:
+                q.put_nowait(event)
+                return
+            except queue.Full:
+                # 队列满说明消费者跟不上：丢弃最旧的帧，只保留最新状态
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+# 本地先校验链接格式，明显无效的输入直接返回 400，不必启动 yt-dlp 提取器访问网络
+YT_RE = re.compile(
+    r"^https?://(?:(?:www|m)\.)?"
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)"
+    r"[\w-]{6,}"
+)
+INVALID_URL = "不是有效的 YouTube 链接"
+
+
+def canonical_url(url: str) -> str:
+    """把 youtu.be / shorts / embed / 带追踪参数的链接统一成 watch?v=<id>，其他链接原样返回"""
+    u = urlsplit(url)
+    host = u.netloc.lower()
+    for prefix in ("www.", "m."):
+        host = host.removeprefix(prefix)
+    vid = ""
+    if host == "youtu.be":
+        vid = u.path.strip("/").split("/")[0]
+    elif host == "youtube.com":
+        if u.path == "/watch":
+            vid = parse_qs(u.query).get("v", [""])[0]
+        elif u.path.startswith(("/shorts/", "/embed/", "/live/")):
+            vid = u.path.split("/")[2]
+    return f"https://www.youtube.com/watch?v={vid}" if vid else url
+
+
+@lru_cache(maxsize=256)
+def fetch_info(url: str) -> dict:
+    """获取视频元信息并整理成前端所需字段；按规范化链接缓存，重复请求不再访问 YouTube"""
+    ydl_opts = {
+        "quiet":          True,
+        "noplaylist":     True,
+        "skip_download":  True,
+        "socket_timeout": SOCKET_TIMEOUT,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    duration = info.get("duration") or 0
+    m, s = divmod(int(duration), 60)
+    h, m = divmod(m, 60)
+    dur_str = f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+    thumbnails = info.get("thumbnails") or []
+    thumb = thumbnails[-1]["url"] if thumbnails else None
+    return {
+        "title":        info.get("title", ""),
+        "channel":      info.get("uploader", ""),
+        "duration_str": dur_str,
+        "thumbnail":    thumb,
+    }
+
+
+# 按链接分段加锁：同一链接的并发请求只有一个真正访问 YouTube，其余等待后直接命中缓存
+_INFO_LOCKS = [threading.Lock() for _ in range(16)]
+
+
+@lru_cache(maxsize=1)
 def get_local_ip() -> str:
+    """本机局域网 IP；首次调用后缓存，之后不再创建 socket"""
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
@@ -70,6 +302,59 @@ def get_local_ip() -> str:
         return "localhost"
 
 
+# DNS 缓存：每个 YoutubeDL 实例都会重新解析 youtube.com / googlevideo.com，
+# 输入链接时 /api/info 会反复调用，缓存 300 秒省掉每次的解析往返
+DNS_TTL = 300
+_getaddrinfo = socket.getaddrinfo
+
+
+@lru_cache(maxsize=256)
+def _resolve(host, port, family, type, proto, flags, _epoch):
+    return _getaddrinfo(host, port, family, type, proto, flags)
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """socket.getaddrinfo 的缓存版本；_epoch 每 DNS_TTL 秒变化一次，旧结果随之失效"""
+    epoch = int(time.monotonic() // DNS_TTL)
+    return list(_resolve(host, port, family, type, proto, flags, epoch))
+
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+
+def _evict(task_id: str) -> None:
+    """删除任务目录并移除任务记录"""
+    shutil.rmtree(DOWNLOAD_DIR / task_id, ignore_errors=True)
+    tasks.pop(task_id, None)
+
+
+def schedule_eviction(task_id: str) -> None:
+    """任务进入终态后，过 TASK_TTL 秒再清理（留足时间给浏览器下载文件）"""
+    timer = threading.Timer(TASK_TTL, _evict, args=(task_id,))
+    timer.daemon = True
+    timer.start()
+
+
+def purge_stale_dirs() -> None:
+    """清理上次运行遗留的过期任务目录（固定 YTDL_DOWNLOAD_DIR 时才会有）。
+    该目录可能与其他数据共用，只删除以任务 UUID 命名的子目录"""
+    cutoff = time.time() - STALE_DIR_AGE
+    try:
+        with os.scandir(DOWNLOAD_DIR) as it:
+            for entry in it:
+                try:
+                    uuid.UUID(entry.name)
+                except ValueError:
+                    continue
+                if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+    except FileNotFoundError:
+        pass
+
+
+purge_stale_dirs()
+
+
 # ─── HTML 前端页面 ──────────────────────────────────────────────────────────────
 
 HTML_PAGE = """\
@@ -256,6 +541,7 @@ footer{
       <button class="q-btn" data-q="1080p">1080p</button>
       <button class="q-btn" data-q="720p">720p</button>
       <button class="q-btn" data-q="480p">480p</button>
+      <button class="q-btn" data-q="fast" title="单文件、无需合并；最高 720p，YouTube 上通常为 360p">极速 ≤720p</button>
       <button class="q-btn" data-q="audio">仅音频</button>
     </div>
 
@@ -385,7 +671,11 @@ function listenProgress(taskId) {
   evtSrc = new EventSource('/api/progress/' + taskId);
   evtSrc.onmessage = function(e) {
     var d = JSON.parse(e.data);
-    if (d.status === 'downloading') {
+    if (d.status === 'queued') {
+      setProgress(0, '排队中...', '', '');
+    } else if (d.status === 'pending') {
+      setProgress(0, '准备中...', '', '');
+    } else if (d.status === 'downloading') {
       setProgress(d.progress || 0, '下载中...', d.speed || '', d.eta || '');
     } else if (d.status === 'processing') {
       setProgress(99, '合并音视频中...', '', '');
@@ -438,11 +728,30 @@ function resetBtn() {
 """
 
 
+# 页面是静态的：启动时预先编码/压缩好，请求时按 Accept-Encoding 直接返回字节
+HTML_UTF8 = HTML_PAGE.encode("utf-8")
+HTML_GZ   = gzip.compress(HTML_UTF8, 9)
+try:
+    import brotli
+    HTML_BR = brotli.compress(HTML_UTF8, quality=11)
+except ImportError:
+    HTML_BR = None
+
+
 # ─── API 路由 ──────────────────────────────────────────────────────────────────
 
 @app.route("/")
 def index():
-    return HTML_PAGE, 200, {"Content-Type": "text/html; charset=utf-8"}
+    accept = request.headers.get("Accept-Encoding", "")
+    headers = {"Content-Type": "text/html; charset=utf-8", "Vary": "Accept-Encoding"}
+    if HTML_BR is not None and "br" in accept:
+        body, headers["Content-Encoding"] = HTML_BR, "br"
+    elif "gzip" in accept:
+        body, headers["Content-Encoding"] = HTML_GZ, "gzip"
+    else:
+        body = HTML_UTF8
+    headers["Content-Length"] = str(len(body))
+    return body, 200, headers
 
 
 @app.route("/api/info", methods=["POST"])
@@ -451,22 +760,12 @@ def api_info():
     url = (request.json or {}).get("url", "").strip()
     if not url:
         return jsonify({"error": "链接不能为空"}), 400
+    if not YT_RE.match(url):
+        return jsonify({"error": INVALID_URL}), 400
+    url = canonical_url(url)
     try:
-        ydl_opts = {"quiet": True, "noplaylist": True, "skip_download": True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-        duration = info.get("duration") or 0
-        m, s = divmod(int(duration), 60)
-        h, m = divmod(m, 60)
-        dur_str = f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
-        thumbnails = info.get("thumbnails") or []
-        thumb = thumbnails[-1]["url"] if thumbnails else None
-        return jsonify({
-            "title":        info.get("title", ""),
-            "channel":      info.get("uploader", ""),
-            "duration_str": dur_str,
-            "thumbnail":    thumb,
-        })
+        with _INFO_LOCKS[hash(url) % len(_INFO_LOCKS)]:
+            return jsonify(fetch_info(url))
     except Exception as exc:
         return jsonify({"error": str(exc)}), 400
 
@@ -479,26 +778,29 @@ def api_start():
     quality = data.get("quality", "best")
     if not url:
         return jsonify({"error": "链接不能为空"}), 400
+    if not YT_RE.match(url):
+        return jsonify({"error": INVALID_URL}), 400
     if quality not in FORMAT_MAP:
         quality = "best"
-    task_id = str(uuid.uuid4())
-    tasks[task_id] = {
-        "status": "pending", "progress": 0,
-        "speed": "", "eta": "", "error": "",
-        "filename": "", "filepath": "",
-    }
-    thread = threading.Thread(
-        target=run_download, args=(task_id, url, quality), daemon=True
-    )
-    thread.start()
+    url = canonical_url(url)
+    key = (url, quality)
+    with _INFLIGHT_LOCK:
+        task_id = inflight.get(key)
+        task    = tasks.get(task_id) if task_id else None
+        if task is not None and task.status not in Task.TERMINAL:
+            return jsonify({"task_id": task_id})
+        task_id = str(uuid.uuid4())
+        tasks[task_id] = Task()
+        inflight[key] = task_id
+    DL_EXECUTOR.submit(run_download, task_id, url, quality)
     return jsonify({"task_id": task_id})
 
 
 def run_download(task_id: str, url: str, quality: str) -> None:
-    """后台下载线程"""
+    """下载线程池中执行的任务"""
     task    = tasks[task_id]
     out_dir = DOWNLOAD_DIR / task_id
-    out_dir.mkdir(parents=True, exist_ok=True)
+    slot    = None                      # 当前占用的名额：DL_SLOTS / MUX_SLOTS
 
     def progress_hook(d: dict) -> None:
         if d["status"] == "downloading":
@@ -510,20 +812,37 @@ def run_download(task_id: str, url: str, quality: str) -> None:
                 fi = d.get("fragment_index", 0)
                 fc = d.get("fragment_count", 0)
                 pct = fi / fc * 100 if fc else 50
-            task.update({
-                "status":   "downloading",
-                "progress": round(pct, 1),
-                "speed":    d.get("_speed_str", "").strip(),
-                "eta":      d.get("_eta_str", "").strip(),
-            })
+            speed = d.get("_speed_str", "").strip()
+            eta   = d.get("_eta_str", "").strip()
+            # 每个分块都会回调：直接在锁内写属性，不为每次回调构造 kwargs 字典
+            with task._lock:
+                task.status   = "downloading"
+                task.progress = round(pct, 1)
+                task.speed    = speed
+                task.eta      = eta
+            # 进度变化 ≥0.5% 或距上次推送 ≥250ms 才推送给 SSE
+            now = time.monotonic()
+            if abs(pct - task._last_pct) >= 0.5 or now - task._last_push >= 0.25:
+                task._last_pct, task._last_push = pct, now
+                task.publish()
         elif d["status"] == "finished":
-            task.update({"status": "processing", "progress": 99})
+            task.update(status="processing", progress=99)
+
+    def postprocessor_hook(d: dict) -> None:
+        nonlocal slot
+        if d["status"] == "started" and slot is DL_SLOTS:
+            # 下载已结束：把下载名额让给排队任务，再占一个后处理名额
+            DL_SLOTS.release()
+            slot = None
+            MUX_SLOTS.acquire()
+            slot = MUX_SLOTS
+            task.update(status="processing", progress=99)
 
     post_processors = []
     if quality == "audio":
         post_processors = [{
             "key": "FFmpegExtractAudio",
-            "preferredcodec": "mp3",
+            "preferredcodec": "m4a",
             "preferredquality": "192",
         }]
 
@@ -535,39 +854,73 @@ def run_download(task_id: str, url: str, quality: str) -> None:
         "quiet":                True,
         "no_warnings":          True,
         "progress_hooks":       [progress_hook],
+        "postprocessor_hooks":  [postprocessor_hook],
         "postprocessors":       post_processors,
+        "concurrent_fragment_downloads": FRAG_WORKERS,
+        "http_chunk_size":      10 * 1024 * 1024,
+        "retries":              3,
+        "fragment_retries":     3,
+        "socket_timeout":       SOCKET_TIMEOUT,
     }
 
+    DL_SLOTS.acquire()
+    slot = DL_SLOTS
     try:
+        task.update(status="pending")
+        out_dir.mkdir(parents=True, exist_ok=True)
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=True)
 
-        # 找到最大的输出文件
-        files = sorted(out_dir.iterdir(), key=lambda f: f.stat().st_size, reverse=True)
-        if not files:
-            raise RuntimeError("下载完成但未找到文件")
-        filepath = files[0]
-        task.update({
-            "status":   "done",
-            "progress": 100,
-            "filepath": str(filepath),
-            "filename": filepath.name,
-            "title":    info.get("title", filepath.stem),
-        })
+        # yt-dlp 会在 requested_downloads 中给出（合并/转码后的）最终文件路径
+        downloads = info.get("requested_downloads") or [{}]
+        filepath = Path(downloads[-1].get("filepath") or info.get("filepath") or "")
+        if not filepath.is_file():
+            # 兜底：取输出目录中最大的文件
+            files = sorted(out_dir.iterdir(), key=lambda f: f.stat().st_size, reverse=True)
+            if not files:
+                raise RuntimeError("下载完成但未找到文件")
+            filepath = files[0]
+        task.update(
+            status="done",
+            progress=100,
+            filepath=str(filepath),
+            filename=filepath.name,
+            title=info.get("title", filepath.stem),
+        )
     except Exception as exc:
-        task.update({"status": "error", "error": str(exc)})
+        task.update(status="error", error=str(exc))
+    finally:
+        if slot is not None:
+            slot.release()
+        with _INFLIGHT_LOCK:
+            if inflight.get((url, quality)) == task_id:
+                del inflight[(url, quality)]
+        schedule_eviction(task_id)
 
 
 @app.route("/api/progress/<task_id>")
 def api_progress(task_id: str):
-    """Server-Sent Events：实时推送下载进度"""
+    """Server-Sent Events：任务状态变化时推送下载进度"""
     def event_stream():
-        for _ in range(1200):          # 最多轮询 10 分钟
-            task = tasks.get(task_id, {"status": "error", "error": "任务不存在"})
-            yield f"data: {json.dumps(task, ensure_ascii=False)}\n\n"
-            if task.get("status") in ("done", "error"):
-                break
-            time.sleep(0.5)
+        task = tasks.get(task_id)
+        if task is None:
+            yield sse_frame({"status": "error", "error": "任务不存在"})
+            return
+        q, (frame, finished) = task.subscribe()
+        try:
+            while True:
+                yield frame
+                if finished:
+                    break
+                while True:
+                    try:
+                        frame, finished = q.get(timeout=SSE_HEARTBEAT)
+                        break
+                    except queue.Empty:
+                        yield b": heartbeat\n\n"
+        finally:
+            # 客户端断开时 WSGI 服务器会关闭生成器，这里注销订阅
+            task.unsubscribe(q)
 
     return Response(
         event_stream(),
@@ -579,24 +932,57 @@ def api_progress(task_id: str):
 @app.route("/api/file/<task_id>")
 def api_file(task_id: str):
     """将已下载文件推送给浏览器（触发手机保存）"""
-    task = tasks.get(task_id, {})
-    if task.get("status") != "done":
+    task = tasks.get(task_id)
+    snap = task.snapshot() if task else {}
+    if snap.get("status") != "done":
         return jsonify({"error": "文件未准备好"}), 404
-    filepath = task.get("filepath", "")
+    filepath = snap["filepath"]
     if not filepath or not Path(filepath).exists():
         return jsonify({"error": "文件不存在"}), 404
 
-    filename = task.get("filename", "video.mp4")
+    filename = snap["filename"] or "video.mp4"
     # 根据扩展名判断 MIME 类型
     ext = Path(filename).suffix.lower()
-    mime = "audio/mpeg" if ext == ".mp3" else "video/mp4"
-
-    return send_file(
-        filepath,
-        as_attachment=True,
-        download_name=filename,
-        mimetype=mime,
-    )
+    mime = MIME_TYPES.get(ext, "video/mp4")
+
+    return send_large_file(filepath, filename, mime)
+
+
+def send_large_file(filepath: str, filename: str, mime: str) -> Response:
+    """
+    以附件形式返回大文件。文件对象交给 wsgi.file_wrapper（gunicorn 等会走 sendfile），
+    服务器不支持时按 1 MiB 分块读取；direct_passthrough 防止 Flask 再次分块。
+    """
+    st = os.stat(filepath)
+    size = st.st_size
+    if USE_XACCEL:
+        # nginx 接管文件发送（含 Range），这里只给出内部路径和响应头
+        rel = Path(filepath).relative_to(DOWNLOAD_DIR).as_posix()
+        rv = Response(mimetype=mime)
+        rv.headers["X-Accel-Redirect"] = XACCEL_PREFIX + quote(rel)
+    else:
+        rv = Response(
+            wrap_file(request.environ, open(filepath, "rb"), buffer_size=1 << 20),
+            mimetype=mime,
+            direct_passthrough=True,
+        )
+        rv.content_length = size
+    # 非 ASCII 文件名按 RFC 6266 同时给出 ASCII 回退名和 UTF-8 编码名
+    try:
+        filename.encode("ascii")
+        disposition = {"filename": filename}
+    except UnicodeEncodeError:
+        disposition = {
+            "filename": filename.encode("ascii", "ignore").decode() or "download",
+            "filename*": f"UTF-8''{quote(filename)}",
+        }
+    rv.headers.set("Content-Disposition", "attachment", **disposition)
+    # ETag / Last-Modified 让断线续传的 If-Range 请求能拿到 206 而不是整个文件
+    rv.last_modified = st.st_mtime
+    rv.set_etag(f"{st.st_mtime_ns:x}-{size:x}")
+    if USE_XACCEL:
+        return rv
+    return rv.make_conditional(request.environ, accept_ranges=True, complete_length=size)
 
 
 # ─── 入口 ──────────────────────────────────────────────────────────────────────
@@ -612,5 +998,7 @@ if __name__ == "__main__":
     print("  ( 手机与电脑需连接同一 Wi-Fi )")
     print("=" * 52)
     print("  画质说明: 最高画质需安装 ffmpeg")
+    if USE_XACCEL:
+        print(f"  文件由 nginx 发送 ({XACCEL_PREFIX} → {DOWNLOAD_DIR})")
     print("  按 Ctrl+C 停止服务\n")
     app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
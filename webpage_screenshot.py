@@ -6,11 +6,29 @@
     python webpage_screenshot.py
 
 然后在浏览器输入屏幕显示的地址即可访问
+
+部署在 nginx 后面时，可设置 USE_XACCEL=1 让 nginx 直接发送截图文件
+（Python 进程不再读写图片数据）。此时需固定截图目录，例如
+SHOT_DIR=/srv/web_shot，并在 nginx 中加入:
+
+    location /_shots/ {
+        internal;
+        alias /srv/web_shot/;
+        sendfile on;
+    }
 """
 
-import io
+import atexit
+import base64
+import gzip
+import hashlib
 import json
+import multiprocessing as mp
 import os
+import queue
+import re
+import shutil
+import signal
 import socket
 import subprocess
 import sys
@@ -18,55 +36,256 @@ import tempfile
 import threading
 import time
 import uuid
+from collections import OrderedDict
+from importlib import invalidate_caches
+from importlib.metadata import PackageNotFoundError, version
+from importlib.util import find_spec
+from multiprocessing.connection import wait
 from pathlib import Path
 
 
+def deps_marker() -> Path:
+    """Chromium 安装标记：文件名带 Playwright 版本，升级后所需的浏览器版本变了，标记随之失效"""
+    try:
+        pw_version = version("playwright")
+    except PackageNotFoundError:
+        pw_version = "none"
+    return Path(tempfile.gettempdir()) / (
+        f"web_shot_deps_{sys.version_info.major}{sys.version_info.minor}_pw{pw_version}.ok"
+    )
+
+
 def ensure_deps() -> None:
-    """自动安装所需依赖"""
-    missing = []
-    for package, import_name in [("flask", "flask"), ("playwright", "playwright")]:
-        try:
-            __import__(import_name)
-        except ImportError:
-            missing.append(package)
+    """
+    自动安装所需依赖。Chromium 安装检查要启动子进程，较慢：成功一次后写入标记文件，
+    之后启动直接跳过（Python 解释器或 Playwright 更新后标记失效；
+    浏览器启动时发现可执行文件缺失也会删除标记，下次启动重新安装）。
+    """
+    missing = [
+        package
+        for package, import_name in [("flask", "flask"), ("playwright", "playwright")]
+        if find_spec(import_name) is None
+    ]
     if missing:
         print(f"正在安装依赖: {', '.join(missing)} ...")
         subprocess.check_call(
             [sys.executable, "-m", "pip", "install"] + missing,
             stdout=subprocess.DEVNULL,
         )
+        invalidate_caches()     # 让刚安装的包能被后续 import 找到
         print("依赖安装完成")
 
-    # 确保 Chromium 已安装
+    marker = deps_marker()
     try:
-        result = subprocess.run(
-            [sys.executable, "-m", "playwright", "install", "--dry-run", "chromium"],
-            capture_output=True, text=True
-        )
-        if "chromium" in result.stdout.lower() or result.returncode != 0:
-            raise Exception("需要安装")
-    except Exception:
+        if not missing and marker.stat().st_mtime > os.stat(sys.executable).st_mtime:
+            return
+    except OSError:
         pass
+
+    # 确保 Chromium 已安装（已安装时 playwright install 会很快返回）
     print("正在检查/安装 Chromium 浏览器（首次运行可能需要几分钟）...")
     subprocess.check_call(
         [sys.executable, "-m", "playwright", "install", "chromium"],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
+    marker.touch()
     print("Chromium 就绪\n")
 
 
-ensure_deps()
+# 截图子进程（名为 shot-N）以 spawn 方式启动，会重新导入本文件；
+# 子进程中跳过安装检查、后台线程等只属于主进程的工作
+IN_WORKER = mp.current_process().name.startswith("shot-")
+
+if not IN_WORKER:
+    ensure_deps()
 
 from flask import Flask, jsonify, request, send_file, Response  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
 
 app = Flask(__name__)
 app.config["JSON_AS_ASCII"] = False
+# 部署在 Apache / lighttpd 后面时可设置 USE_X_SENDFILE=1，由前端服务器直接发送截图文件
+app.use_x_sendfile = bool(os.environ.get("USE_X_SENDFILE"))
+
+# 可选：安装了 orjson 时用它序列化 SSE 消息和 API 响应（C 实现，直接输出 UTF-8 bytes）
+try:
+    import orjson
+
+    def json_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    class OrjsonProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(obj, default=self.default).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+except ImportError:
+    def json_bytes(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
 
-# 截图任务存储（内存中）
-tasks: dict[str, dict] = {}
 
-SCREENSHOT_DIR = Path(tempfile.mkdtemp(prefix="web_shot_"))
+def sse_frame(obj) -> bytes:
+    return b"data: " + json_bytes(obj) + b"\n\n"
+
+
+# 可选：安装了 flask-compress 时压缩 JSON 响应（优先 brotli）。
+# 只处理 JSON：图片本身已压缩，首页已预压缩，SSE 流式响应不能被缓冲压缩
+try:
+    from flask_compress import Compress
+
+    app.config.update(
+        COMPRESS_MIMETYPES=["application/json"],
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_MIN_SIZE=200,
+        COMPRESS_STREAMS=False,
+    )
+    Compress(app)
+except ImportError:
+    pass
+
+# 设置后图片请求只返回 X-Accel-Redirect 头，由 nginx 的 internal location 发送文件
+USE_XACCEL    = bool(os.environ.get("USE_XACCEL"))
+XACCEL_PREFIX = "/_shots/"
+if USE_XACCEL and not os.environ.get("SHOT_DIR"):
+    # 随机临时目录无法写进 nginx 的 alias，所有图片请求都会 404
+    sys.exit("USE_XACCEL 需要同时设置 SHOT_DIR（与 nginx 中 alias 指向的目录一致）")
+
+SCREENSHOT_DIR = Path(os.environ.get("SHOT_DIR") or tempfile.mkdtemp(prefix="web_shot_"))
+SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+MAX_TASKS = 1000        # 最多保留的任务数
+TASK_TTL  = 1800        # 秒：任务及截图文件的保留时长
+
+
+class TaskStore:
+    """
+    截图任务登记表。按创建顺序保存，超过 TASK_TTL 或数量超过 MAX_TASKS 时淘汰最旧的任务，
+    并删除对应的截图文件，服务长时间运行时内存和磁盘占用都有上限。
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._items: OrderedDict[int, dict] = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def get(self, key: int) -> dict | None:
+        with self._lock:
+            return self._items.get(key)
+
+    def discard(self, key: int) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def add(self, key: int, task: dict) -> None:
+        task["ts"] = time.monotonic()
+        with self._lock:
+            self._items[key] = task
+        self.expire()
+
+    def expire(self) -> None:
+        """淘汰过期 / 超量的任务；删除文件放在锁外进行"""
+        deadline = time.monotonic() - self.ttl
+        evicted = []
+        with self._lock:
+            while self._items:
+                key, task = next(iter(self._items.items()))
+                if len(self._items) <= self.maxsize and task["ts"] > deadline:
+                    break
+                del self._items[key]
+                evicted.append(key)
+        # 预览图和按需转换出的下载文件都以 32 位十六进制的 task_id 命名
+        for key in evicted:
+            for path in SCREENSHOT_DIR.glob(f"{key:032x}.*"):
+                path.unlink(missing_ok=True)
+
+
+# 截图任务存储（内存中，有上限）。以 UUID 的 128 位整数为键，task_id 为其十六进制形式
+tasks = TaskStore(MAX_TASKS, TASK_TTL)
+
+
+def task_key(task_id: str) -> int | None:
+    """把 URL 中的 task_id 转成整数键（同时完成格式校验）；无效时返回 None"""
+    try:
+        return uuid.UUID(task_id).int
+    except ValueError:
+        return None
+
+
+def janitor() -> None:
+    """定期清理过期任务，没有新请求时也能回收文件"""
+    while True:
+        time.sleep(60)
+        tasks.expire()
+
+
+if not IN_WORKER:
+    threading.Thread(target=janitor, name="shot-janitor", daemon=True).start()
+if not os.environ.get("SHOT_DIR"):
+    atexit.register(shutil.rmtree, SCREENSHOT_DIR, ignore_errors=True)
+
+
+# 任务状态变化时唤醒等待中的 SSE 连接
+TASK_COND     = threading.Condition()
+SSE_HEARTBEAT = 15      # 秒：状态无变化时发送注释行，防止代理断开空闲连接
+
+
+def update_task(task: dict, **fields) -> None:
+    """修改任务字段并通知 SSE 连接"""
+    with TASK_COND:
+        task.update(fields)
+        TASK_COND.notify_all()
+
+
+def public_view(task: dict) -> dict:
+    """返回给前端的任务字段（不含服务器路径等内部信息）"""
+    return {k: v for k, v in task.items() if k not in ("filepath", "ts")}
+
+
+def short_error(exc: Exception) -> str:
+    """Playwright 的异常信息带有很长的调用日志，只保留第一行"""
+    msg = str(exc).strip().splitlines()
+    return msg[0][:300] if msg else exc.__class__.__name__
+
+# 常驻截图进程数：每个进程持有自己的 Playwright 和一个预热好的 Chromium，任务间复用。
+# 与 Playwright 通信、解码截图数据都在子进程里完成，不占用 Web 服务进程的 GIL
+SHOT_WORKERS = int(os.environ.get("SHOT_WORKERS", "2"))
+# 无头截图用不到 GPU / 扩展；关闭后台节流，避免非前台页面的定时器和渲染被推迟导致截图卡住
+LAUNCH_ARGS  = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-ipc-flooding-protection",
+    "--disable-hang-monitor",
+    "--no-zygote",
+    "--disable-features=TranslateUI",
+]
+# 待处理任务：(task_id, url, device_key, format)，在主进程中排队，逐个交给空闲的截图进程。
+# 积压有上限：突发请求过多时直接返回 503，而不是让排队时间无限变长。
+# 每个子进程一条 Pipe：主进程发任务（None 表示退出），子进程回 (task_id, 字段) 形式的状态，
+# 只传路径不传图片数据
+MP          = mp.get_context("spawn")   # 主进程已有线程，fork 不安全
+MAX_PENDING = int(os.environ.get("SHOT_MAX_PENDING", "16"))
+JOBS: queue.Queue = queue.Queue(maxsize=MAX_PENDING)
+WORKER_DIED = "截图进程意外退出，请重试"
+
+# 每个任务只截一张整页图，按请求的格式（默认 JPEG）由浏览器直接编码，预览和下载共用这一张。
+IMAGE_FORMATS = {
+    "jpeg": {"mimetype": "image/jpeg", "ext": ".jpg"},
+    "png":  {"mimetype": "image/png",  "ext": ".png"},
+    "webp": {"mimetype": "image/webp", "ext": ".webp"},
+}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+WEBP_MAX_PX  = 16383    # WebP 单边像素上限，超长页面改截 JPEG
 
 # 设备预设
 DEVICES = {
@@ -117,6 +336,19 @@ DEVICES = {
 }
 
 
+# 每个设备对应的 new_context() 参数，启动时构造一次，截图时直接展开
+CONTEXT_KWARGS = {
+    key: {
+        "viewport":            {"width": dev["width"], "height": dev["height"]},
+        "device_scale_factor": dev["device_scale_factor"],
+        "is_mobile":           True,
+        "has_touch":           True,
+        "user_agent":          dev["user_agent"],
+    }
+    for key, dev in DEVICES.items()
+}
+
+
 def get_local_ip() -> str:
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -128,49 +360,299 @@ def get_local_ip() -> str:
         return "localhost"
 
 
-def run_screenshot(task_id: str, url: str, device_key: str) -> None:
-    """后台截图线程"""
-    from playwright.sync_api import sync_playwright  # noqa: PLC0415
+# 统计/广告脚本和音视频对截图没有用处，只会拖慢页面加载：通过 context.route 拦截。
+# 图片和字体会影响截图效果，不拦截。
+TRACKER_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google.com", "connect.facebook.net",
+    "hotjar.com", "scorecardresearch.com", "mixpanel.com", "segment.io",
+    "hm.baidu.com", "cnzz.com", "51.la",
+]
+MEDIA_EXTS = ["mp4", "webm", "m4s", "m3u8", "mpd", "mp3", "m4a", "ogg", "wav", "flac"]
+BLOCK_RE = re.compile(
+    r"^[a-z]+://(?:[^/?#]*\.)?(?:" + "|".join(map(re.escape, TRACKER_HOSTS)) + r")(?::\d+)?/"
+    r"|\.(?:" + "|".join(MEDIA_EXTS) + r")(?:[?#]|$)",
+    re.IGNORECASE,
+)
+
+
+def block_subresource(route) -> None:
+    """只拦截子资源：截图对象本身（例如 mixpanel.com 首页或 .mp4 链接）照常加载"""
+    request = route.request
+    if request.is_navigation_request() and request.frame.parent_frame is None:
+        route.continue_()
+    else:
+        route.abort()
+
+
+# 逐屏滚动到底部再回到顶部，让懒加载图片进入视口；最多 3 秒，防止无限滚动页面卡住
+SCROLL_JS = """
+async () => {
+  const deadline = Date.now() + 3000;
+  const frame = () => new Promise(r => requestAnimationFrame(() => r()));
+  let y = 0;
+  while (y < document.documentElement.scrollHeight && Date.now() < deadline) {
+    y += window.innerHeight;
+    window.scrollTo(0, y);
+    await frame();
+  }
+  window.scrollTo(0, 0);
+  await frame();
+}
+"""
 
-    task = tasks[task_id]
-    device = DEVICES.get(device_key, DEVICES["iphone12"])
 
+def capture_full_page(context, page, fmt: str, scale: float, stem: Path) -> tuple[str, Path, int]:
+    """
+    通过 CDP 直接调用 Page.captureScreenshot 截取整页，解码后直接写入 stem + 扩展名。
+    optimizeForSpeed 让 Chromium 使用更快的编码参数（PNG 走低压缩级别的快速 zlib），
+    同时省去 Playwright 高层封装的额外处理。返回 (实际格式, 文件路径, 文件大小)。
+    """
+    cdp = context.new_cdp_session(page)
     try:
-        task["status"] = "launching"
-        with sync_playwright() as p:
-            browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
-            context = browser.new_context(
-                viewport={"width": device["width"], "height": device["height"]},
-                device_scale_factor=device["device_scale_factor"],
-                is_mobile=True,
-                has_touch=True,
-                user_agent=device["user_agent"],
-            )
+        metrics = cdp.send("Page.getLayoutMetrics")
+        size = metrics.get("cssContentSize") or metrics["contentSize"]
+        if fmt == "webp" and max(size["width"], size["height"]) * scale > WEBP_MAX_PX:
+            fmt = "jpeg"
+        params = {
+            "format": fmt,
+            "captureBeyondViewport": True,
+            "optimizeForSpeed": True,
+            "clip": {"x": 0, "y": 0, "width": size["width"], "height": size["height"], "scale": 1},
+        }
+        if fmt == "jpeg":
+            params["quality"] = JPEG_QUALITY
+        elif fmt == "webp":
+            params["quality"] = WEBP_QUALITY
+        data = cdp.send("Page.captureScreenshot", params)["data"]
+        path = stem.with_suffix(IMAGE_FORMATS[fmt]["ext"])
+        # 解码结果不在 Python 中保留，写盘后即释放
+        return fmt, path, path.write_bytes(base64.b64decode(data))
+    finally:
+        cdp.detach()
+
+
+def run_screenshot(browser, conn, task_id: str, url: str, device_key: str, fmt: str) -> None:
+    """在已启动的浏览器中截图：每个任务一个独立的 BrowserContext，用完即关"""
+    def report(**fields) -> None:
+        conn.send((task_id, fields))
+
+    kwargs = CONTEXT_KWARGS.get(device_key, CONTEXT_KWARGS["iphone12"])
+
+    try:
+        context = browser.new_context(**kwargs)
+        try:
+            # 正则由 Playwright 驱动匹配（不是 Chromium），命中的请求都要经 block_subresource 往返一次
+            context.route(BLOCK_RE, block_subresource)
             page = context.new_page()
-            task["status"] = "loading"
-            page.goto(url, wait_until="networkidle", timeout=45_000)
-            # 等待懒加载图片等
-            page.wait_for_timeout(1500)
-            task["status"] = "capturing"
-            screenshot_bytes = page.screenshot(full_page=True, type="png")
-            browser.close()
-
-        out_path = SCREENSHOT_DIR / f"{task_id}.png"
-        out_path.write_bytes(screenshot_bytes)
-        task.update({
-            "status": "done",
-            "filepath": str(out_path),
-            "size": len(screenshot_bytes),
-        })
+            report(status="loading")
+            # DOM 就绪即开始：滚动一遍触发懒加载，再等 load 事件（最多 10 秒，超时照样截图）
+            page.goto(url, wait_until="domcontentloaded", timeout=45_000)
+            try:
+                page.evaluate(SCROLL_JS)
+            except Exception:
+                pass    # 页面在脚本执行中跳转（location.replace、同意页等），照常等待新页面加载
+            try:
+                page.wait_for_load_state("load", timeout=10_000)
+            except Exception:
+                pass
+            report(status="capturing")
+            fmt, out_path, size = capture_full_page(
+                context, page, fmt, kwargs["device_scale_factor"], SCREENSHOT_DIR / task_id
+            )
+        finally:
+            context.close()
+
+        report(status="done", filepath=str(out_path), format=fmt, size=size)
+    except Exception as exc:
+        report(status="error", error=short_error(exc))
+
+
+def launch_browser(p):
+    try:
+        return p.chromium.launch(args=LAUNCH_ARGS)
     except Exception as exc:
-        task.update({"status": "error", "error": str(exc)})
+        if "Executable doesn't exist" in str(exc):
+            # ~/.cache/ms-playwright 被清理等情况：标记已不可信，下次启动时重新安装
+            deps_marker().unlink(missing_ok=True)
+        raise
+
+
+def browser_worker(conn) -> None:
+    """截图子进程：启动时预热 Chromium，之后逐个处理主进程经 conn 发来的任务"""
+    # Ctrl+C 交给主进程处理，退出时主进程会发送 None 让这里收尾
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from playwright.sync_api import sync_playwright  # noqa: PLC0415
+
+    with sync_playwright() as p:
+        browser = None
+        try:
+            try:
+                browser = launch_browser(p)
+            except Exception:
+                pass    # 启动失败时留到处理任务时重试，错误会记录到任务上
+            while True:
+                try:
+                    job = conn.recv()
+                except EOFError:    # 主进程已退出
+                    break
+                if job is None:
+                    break
+                try:
+                    if browser is None or not browser.is_connected():
+                        conn.send((job[0], {"status": "launching"}))
+                        browser = launch_browser(p)
+                except Exception as exc:
+                    browser = None
+                    conn.send((job[0], {"status": "error", "error": short_error(exc)}))
+                    continue
+                run_screenshot(browser, conn, *job)
+        finally:
+            if browser is not None:
+                browser.close()
+
+
+class ShotWorker:
+    """主进程中的截图子进程句柄：记录它正在处理的任务，进程意外退出时据此标记失败"""
+
+    def __init__(self, index: int) -> None:
+        self.index   = index
+        self.task_id = None     # 正在处理的任务，空闲时为 None
+        self.alive   = True
+        self.started = time.monotonic()
+        self.conn, child_conn = MP.Pipe()
+        self.proc = MP.Process(
+            target=browser_worker, args=(child_conn,), name=f"shot-{index}", daemon=True
+        )
+        self.proc.start()
+        child_conn.close()      # 只留子进程持有另一端：子进程退出后这边能收到 EOF
+
+
+_workers: list[ShotWorker] = []
+_IDLE: queue.Queue = queue.Queue()      # 空闲的截图进程
+_POOL_LOCK = threading.Lock()           # 保护 ShotWorker 的 task_id / alive
+_STOPPING  = threading.Event()
+
+
+def fail_task(task_id: str, error: str) -> None:
+    task = tasks.get(int(task_id, 16))
+    if task is not None and task["status"] not in ("done", "error"):
+        update_task(task, status="error", error=error)
+
+
+def apply_result(task_id: str, fields: dict) -> None:
+    """把子进程发回的状态写入任务并通知 SSE 连接"""
+    task = tasks.get(int(task_id, 16))
+    if task is not None:
+        update_task(task, **fields)
+    elif fields.get("filepath"):    # 截图期间任务已被淘汰，文件无人认领
+        Path(fields["filepath"]).unlink(missing_ok=True)
+
+
+def dispatch() -> None:
+    """主进程线程：把积压的任务逐个交给空闲的截图进程"""
+    while True:
+        job = JOBS.get()
+        if tasks.get(int(job[0], 16)) is None:      # 排队期间已被淘汰
+            continue
+        while True:
+            worker = _IDLE.get()
+            with _POOL_LOCK:
+                if not worker.alive:
+                    continue
+                worker.task_id = job[0]
+                try:
+                    worker.conn.send(job)
+                except OSError:
+                    pass    # 进程刚好退出：replace_worker 会把这个任务标记失败
+                break
+
+
+def replace_worker(worker: ShotWorker) -> None:
+    """子进程退出后：收完它已发出的状态，把手头的任务标记失败，再启动一个新进程顶替"""
+    with _POOL_LOCK:
+        worker.alive = False
+        task_id = worker.task_id
+    _workers.remove(worker)
+    try:
+        while worker.conn.poll():
+            apply_result(*worker.conn.recv())
+    except (EOFError, OSError):
+        pass
+    worker.conn.close()
+    if task_id is not None:
+        fail_task(task_id, WORKER_DIED)
+    if _STOPPING.is_set():
+        return      # 正常退出流程，由 stop_workers 回收进程
+    worker.proc.join()
+    if time.monotonic() - worker.started < 5:
+        time.sleep(1)       # 启动即崩溃时不要空转
+    new = ShotWorker(worker.index)
+    _workers.append(new)
+    _IDLE.put(new)
+
+
+def supervise() -> None:
+    """主进程线程：接收各子进程的状态；通过 proc.sentinel 发现意外退出的进程并替换"""
+    while not (_STOPPING.is_set() and not _workers):
+        handles = {}
+        for worker in _workers:
+            handles[worker.conn] = worker
+            handles[worker.proc.sentinel] = worker
+        for ready in wait(list(handles)):
+            worker = handles[ready]
+            if worker not in _workers:      # 同一轮中已经处理过退出
+                continue
+            if ready is worker.proc.sentinel:
+                replace_worker(worker)
+                continue
+            try:
+                task_id, fields = worker.conn.recv()
+            except (EOFError, OSError):
+                replace_worker(worker)
+                continue
+            apply_result(task_id, fields)
+            if fields["status"] in ("done", "error"):
+                with _POOL_LOCK:
+                    worker.task_id = None
+                _IDLE.put(worker)
+
+
+def start_workers() -> None:
+    # 子进程重新导入本文件时沿用同一个截图目录
+    os.environ["SHOT_DIR"] = str(SCREENSHOT_DIR)
+    for i in range(SHOT_WORKERS):
+        worker = ShotWorker(i)
+        _workers.append(worker)
+        _IDLE.put(worker)
+    threading.Thread(target=dispatch, name="shot-dispatch", daemon=True).start()
+    threading.Thread(target=supervise, name="shot-supervise", daemon=True).start()
+
+
+@atexit.register
+def stop_workers() -> None:
+    """退出时让每个进程处理完手头任务后关闭浏览器，超时则强制结束"""
+    _STOPPING.set()
+    workers = list(_workers)
+    for worker in workers:
+        with _POOL_LOCK:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+    for worker in workers:
+        worker.proc.join(timeout=5)
+        if worker.proc.is_alive():
+            worker.proc.terminate()
+
+
+if not IN_WORKER:
+    start_workers()
 
 
 # ─── HTML 前端页面 ──────────────────────────────────────────────────────────────
 
-_DEVICES_JSON = json.dumps(
-    {k: v["label"] for k, v in DEVICES.items()}, ensure_ascii=False
-)
+_DEVICES_JSON = json_bytes({k: v["label"] for k, v in DEVICES.items()}).decode()
 
 HTML_PAGE = """\
 <!DOCTYPE html>
@@ -351,7 +833,7 @@ footer{
       <div class="preview-box">
         <img class="preview-img" id="previewImg" src="" alt="截图预览">
       </div>
-      <a class="save-btn" id="saveLink" href="#" download="screenshot.png">
+      <a class="save-btn" id="saveLink" href="#" download>
         ⬇&nbsp; 保存截图到本地
       </a>
     </div>
@@ -368,7 +850,7 @@ footer{
 <script>
 var DEVICES = """ + _DEVICES_JSON + """;
 var selectedDevice = 'iphone12';
-var pollTimer = null;
+var evtSrc = null;
 
 /* ── 渲染设备按钮 ── */
 (function buildDevBtns() {
@@ -415,7 +897,7 @@ async function startShot() {
   document.getElementById('progWrap').classList.add('show');
   document.getElementById('shotBtn').disabled = true;
   setStatus('正在启动浏览器...');
-  if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+  if (evtSrc) { evtSrc.close(); evtSrc = null; }
 
   try {
     var res = await fetch('/api/screenshot/start', {
@@ -425,42 +907,41 @@ async function startShot() {
     });
     var d = await res.json();
     if (d.error) { showErr(d.error); resetBtn(); return; }
-    pollStatus(d.task_id);
+    listenStatus(d.task_id);
   } catch(e) {
     showErr('网络错误，请重试');
     resetBtn();
   }
 }
 
-/* ── 轮询状态 ── */
-function pollStatus(taskId) {
+/* ── SSE 状态推送 ── */
+function listenStatus(taskId) {
   var statusMap = {
     pending:    '排队中...',
     launching:  '启动浏览器中...',
     loading:    '加载页面中...',
     capturing:  '正在截图...',
   };
-  pollTimer = setInterval(async function() {
-    try {
-      var res = await fetch('/api/screenshot/status/' + taskId);
-      var d = await res.json();
-      if (d.status in statusMap) {
-        setStatus(statusMap[d.status]);
-      } else if (d.status === 'done') {
-        clearInterval(pollTimer);
-        showResult(taskId, d.size);
-        resetBtn();
-      } else if (d.status === 'error') {
-        clearInterval(pollTimer);
-        showErr(d.error || '截图失败，请检查网址是否正确');
-        resetBtn();
-      }
-    } catch(e) {
-      clearInterval(pollTimer);
-      showErr('查询状态失败，请重试');
+  evtSrc = new EventSource('/api/screenshot/stream/' + taskId);
+  evtSrc.onmessage = function(e) {
+    var d = JSON.parse(e.data);
+    if (d.status in statusMap) {
+      setStatus(statusMap[d.status]);
+    } else if (d.status === 'done') {
+      evtSrc.close();
+      showResult(taskId, d.size);
+      resetBtn();
+    } else if (d.status === 'error') {
+      evtSrc.close();
+      showErr(d.error || '截图失败，请检查网址是否正确');
       resetBtn();
     }
-  }, 800);
+  };
+  evtSrc.onerror = function() {
+    evtSrc.close();
+    showErr('连接中断，请重试');
+    resetBtn();
+  };
 }
 
 function setStatus(msg) {
@@ -469,9 +950,9 @@ function setStatus(msg) {
 
 function showResult(taskId, size) {
   document.getElementById('progWrap').classList.remove('show');
-  var url = '/api/screenshot/file/' + taskId;
-  document.getElementById('previewImg').src = url + '?t=' + Date.now();
-  document.getElementById('saveLink').href = url;
+  /* 预览和保存是同一张截图；文件名以服务器返回的为准 */
+  document.getElementById('previewImg').src = '/api/screenshot/preview/' + taskId;
+  document.getElementById('saveLink').href  = '/api/screenshot/file/' + taskId;
   var kb = size ? ' · ' + Math.round(size / 1024) + ' KB' : '';
   document.getElementById('imgMeta').textContent = '截图完成' + kb;
   document.getElementById('resultWrap').classList.add('show');
@@ -493,11 +974,37 @@ function resetBtn() {
 """
 
 
+# 页面是静态的：启动时预先编码、压缩并计算 ETag，浏览器带 If-None-Match 时直接回 304
+HTML_UTF8 = HTML_PAGE.encode("utf-8")
+HTML_GZ   = gzip.compress(HTML_UTF8, 9)
+HTML_ETAG = hashlib.sha256(HTML_UTF8).hexdigest()[:16]
+
+
+def _html_response(body: bytes, status: int = 200, encoding: str | None = None) -> Response:
+    rv = Response(body, status=status, mimetype="text/html")
+    rv.set_etag(HTML_ETAG)
+    rv.headers["Cache-Control"] = "no-cache"
+    rv.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        rv.headers["Content-Encoding"] = encoding
+    return rv
+
+
+# 三种可能的首页响应在启动时构造好，请求时直接返回同一个对象（只读，可跨请求共享）
+HTML_RESP     = _html_response(HTML_UTF8)
+HTML_RESP_GZ  = _html_response(HTML_GZ, encoding="gzip")
+HTML_RESP_304  = _html_response(b"", status=304)
+
+
 # ─── API 路由 ──────────────────────────────────────────────────────────────────
 
 @app.route("/")
 def index():
-    return HTML_PAGE, 200, {"Content-Type": "text/html; charset=utf-8"}
+    if request.if_none_match.contains(HTML_ETAG):
+        return HTML_RESP_304
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        return HTML_RESP_GZ
+    return HTML_RESP
 
 
 @app.route("/api/screenshot/start", methods=["POST"])
@@ -505,51 +1012,144 @@ def api_start():
     data = request.json or {}
     url = data.get("url", "").strip()
     device = data.get("device", "iphone12")
+    fmt = data.get("format", "jpeg")
     if not url:
         return jsonify({"error": "请输入网页地址"}), 400
     if not url.startswith(("http://", "https://")):
         url = "https://" + url
     if device not in DEVICES:
         device = "iphone12"
+    if fmt not in IMAGE_FORMATS:
+        fmt = "jpeg"
 
-    task_id = str(uuid.uuid4())
-    tasks[task_id] = {
+    tid = uuid.uuid4()
+    task_id = tid.hex
+    tasks.add(tid.int, {
         "status": "pending",
         "error": "",
         "filepath": "",
         "size": 0,
-    }
-    thread = threading.Thread(
-        target=run_screenshot, args=(task_id, url, device), daemon=True
-    )
-    thread.start()
+        "format": fmt,
+    })
+    try:
+        JOBS.put_nowait((task_id, url, device, fmt))
+    except queue.Full:
+        tasks.discard(tid.int)
+        return jsonify({"error": "当前截图任务较多，请稍后再试"}), 503
     return jsonify({"task_id": task_id})
 
 
+INVALID_TASK_ID = ({"status": "error", "error": "无效的任务 ID"}, 400)
+
+
 @app.route("/api/screenshot/status/<task_id>")
 def api_status(task_id: str):
-    task = tasks.get(task_id)
+    key = task_key(task_id)
+    if key is None:
+        return INVALID_TASK_ID
+    task = tasks.get(key)
     if task is None:
         return jsonify({"status": "error", "error": "任务不存在"}), 404
-    return jsonify({k: v for k, v in task.items() if k != "filepath"})
+    return jsonify(public_view(task))
+
+
+@app.route("/api/screenshot/stream/<task_id>")
+def api_stream(task_id: str):
+    """Server-Sent Events：任务状态变化时推送，取代前端定时轮询"""
+    key = task_key(task_id)
+    if key is None:
+        return INVALID_TASK_ID
+
+    def generate():
+        task = tasks.get(key)
+        if task is None:
+            yield sse_frame({"status": "error", "error": "任务不存在"})
+            return
+        last = None
+        while True:
+            with TASK_COND:
+                TASK_COND.wait_for(lambda: task["status"] != last, timeout=SSE_HEARTBEAT)
+                view = public_view(task)
+            if view["status"] == last:
+                # 任务已被淘汰或超过保留时长：不再无限期地发心跳
+                if tasks.get(key) is not task or time.monotonic() - task["ts"] > TASK_TTL:
+                    yield sse_frame({"status": "error", "error": "任务已过期"})
+                    return
+                yield b": heartbeat\n\n"
+                continue
+            last = view["status"]
+            yield sse_frame(view)
+            if last in ("done", "error"):
+                break
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@app.route("/api/screenshot/file/<task_id>")
-def api_file(task_id: str):
-    task = tasks.get(task_id, {})
-    if task.get("status") != "done":
-        return jsonify({"error": "截图未完成"}), 404
-    filepath = task.get("filepath", "")
-    if not filepath or not Path(filepath).exists():
-        return jsonify({"error": "文件不存在"}), 404
+def send_image(task_id: str, filepath: Path, fmt: str, as_attachment: bool) -> Response:
+    """
+    每个任务的图片生成后不再变化：以 task_id 作 ETag，浏览器可缓存并用 304 复验。
+    send_file 会把文件交给 wsgi.file_wrapper，USE_XACCEL 时则整个交给 nginx 发送。
+    """
+    image = IMAGE_FORMATS[fmt]
+    if USE_XACCEL:
+        rv = Response(mimetype=image["mimetype"])
+        rv.headers["X-Accel-Redirect"] = XACCEL_PREFIX + filepath.name
+        rv.headers.set(
+            "Content-Disposition",
+            "attachment" if as_attachment else "inline",
+            filename="screenshot" + image["ext"],
+        )
+        rv.cache_control.public  = True
+        rv.cache_control.max_age = 3600
+        return rv
     return send_file(
         filepath,
-        mimetype="image/png",
-        as_attachment=True,
-        download_name="screenshot.png",
+        mimetype=image["mimetype"],
+        as_attachment=as_attachment,
+        download_name="screenshot" + image["ext"],
+        conditional=True,
+        etag=f"{task_id}-{fmt}",
+        last_modified=filepath.stat().st_mtime,
+        max_age=3600,
     )
 
 
+def finished_capture(key: int) -> tuple[dict, Path] | tuple[None, None]:
+    task = tasks.get(key)
+    if task is None or task["status"] != "done":
+        return None, None
+    filepath = Path(task["filepath"])
+    return (task, filepath) if filepath.exists() else (None, None)
+
+
+@app.route("/api/screenshot/preview/<task_id>")
+def api_preview(task_id: str):
+    """页面内预览：与下载是同一个文件，只是以 inline 方式返回"""
+    key = task_key(task_id)
+    if key is None:
+        return INVALID_TASK_ID
+    task, filepath = finished_capture(key)
+    if task is None:
+        return jsonify({"error": "截图未完成"}), 404
+    return send_image(task_id, filepath, task["format"], as_attachment=False)
+
+
+@app.route("/api/screenshot/file/<task_id>")
+def api_file(task_id: str):
+    """下载：截图进程已按请求的格式写好文件，这里只负责发送"""
+    key = task_key(task_id)
+    if key is None:
+        return INVALID_TASK_ID
+    task, filepath = finished_capture(key)
+    if task is None:
+        return jsonify({"error": "截图未完成"}), 404
+    return send_image(task_id, filepath, task["format"], as_attachment=True)
+
+
 # ─── 入口 ──────────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -564,4 +1164,18 @@ if __name__ == "__main__":
     print("=" * 52)
     print("  支持设备: iPhone 12/13, iPhone SE, Pixel 7, iPad Mini")
     print("  按 Ctrl+C 停止服务\n")
-    app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
+    # SIGTERM 转成正常退出，让 atexit 关闭各线程的浏览器
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        # 安装了 waitress 时用它代替 Flask 开发服务器：线程数有上限，连接管理更完善
+        from waitress import serve
+    except ImportError:
+        app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
+    else:
+        # 每个 SSE 连接会占住一个线程：按最多排队任务数留足余量
+        serve(
+            app, host="0.0.0.0", port=port,
+            threads=MAX_PENDING + SHOT_WORKERS + 8,
+            connection_limit=100,
+            cleanup_interval=30,
+        )